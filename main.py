@@ -4,11 +4,14 @@ Main application entry point
 """
 
 import sys
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 from src.gui.main_window import MainWindow
 
 def main():
     """Main application entry point"""
+    # Let Qt merge queued mouse moves so fast strokes don't flood the canvas
+    QApplication.setAttribute(Qt.AA_CompressHighFrequencyEvents, True)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,147 @@
+"""
+Flood fill kernels used by the canvas
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+def run_length(values, target):
+    """Returns how many leading entries of values are equal to target"""
+    differs = values != target
+    index = int(differs.argmax())
+    return index if differs[index] else len(values)
+
+
+def scanline_fill(pixels, x, y, target, replacement):
+    """Scanline flood fill (4-connected) of a 2D array, done in place.
+    
+    Written as plain loops over an int32 array used as the seed stack so
+    Numba can compile it. Returns the bounding box of the filled area as
+    (min_x, min_y, max_x, max_y).
+    """
+    height, width = pixels.shape
+    min_x, min_y, max_x, max_y = x, y, x, y
+    stack = np.empty((max(height, 64), 2), dtype=np.int32)
+    stack[0, 0], stack[0, 1] = x, y
+    size = 1
+    
+    while size:
+        size -= 1
+        cx, cy = stack[size, 0], stack[size, 1]
+        if pixels[cy, cx] != target:
+            continue
+        
+        # Extend the span to the left and right of the seed and fill it
+        left = cx
+        while left > 0 and pixels[cy, left - 1] == target:
+            left -= 1
+        right = cx
+        while right < width - 1 and pixels[cy, right + 1] == target:
+            right += 1
+        for i in range(left, right + 1):
+            pixels[cy, i] = replacement
+        
+        min_x, max_x = min(min_x, left), max(max_x, right)
+        min_y, max_y = min(min_y, cy), max(max_y, cy)
+        
+        # Push one seed per run of target color in the rows above and below
+        for ny in (cy - 1, cy + 1):
+            if 0 <= ny < height:
+                in_run = False
+                for i in range(left, right + 1):
+                    if pixels[ny, i] == target:
+                        if not in_run:
+                            if size == len(stack):
+                                grown = np.empty((2 * size, 2), dtype=np.int32)
+                                grown[:size] = stack
+                                stack = grown
+                            stack[size, 0], stack[size, 1] = i, ny
+                            size += 1
+                        in_run = True
+                    else:
+                        in_run = False
+    
+    return min_x, min_y, max_x, max_y
+
+
+def scanline_fill_numpy(pixels, x, y, target, replacement):
+    """NumPy version of scanline_fill, used when Numba is not installed"""
+    # Overwriting a span is what marks it as visited, and seeds are taken
+    # breadth-first so spans are visited in row order.
+    height = pixels.shape[0]
+    seeds = deque([(x, y)])
+    min_x, min_y, max_x, max_y = x, y, x, y
+    
+    while seeds:
+        cx, cy = seeds.popleft()
+        row = pixels[cy]
+        if row[cx] != target:
+            continue
+        
+        # Extend the span to the left and right of the seed and fill it
+        left = cx - run_length(row[cx::-1], target) + 1
+        right = cx + run_length(row[cx:], target)
+        row[left:right] = replacement
+        
+        min_x, max_x = min(min_x, left), max(max_x, right - 1)
+        min_y, max_y = min(min_y, cy), max(max_y, cy)
+        
+        # Push one seed per run of target color in the rows above and below
+        for ny in (cy - 1, cy + 1):
+            if 0 <= ny < height:
+                matches = pixels[ny, left:right] == target
+                starts = np.flatnonzero(matches[1:] & ~matches[:-1]) + 1
+                if matches[0]:
+                    seeds.append((left, ny))
+                seeds.extend((left + int(sx), ny) for sx in starts)
+    
+    return min_x, min_y, max_x, max_y
+
+
+def opencv_kernel(cv2):
+    """Returns a fill kernel that uses OpenCV's native floodFill.
+    
+    OpenCV fills the region of the seed pixel's color, which callers
+    guarantee is target.
+    """
+    def fill(pixels, x, y, target, replacement):
+        # OpenCV has no unsigned 32-bit type, so packed pixels are filled as int32
+        if pixels.dtype == np.uint32:
+            pixels = pixels.view(np.int32)
+            replacement = int(np.uint32(replacement).view(np.int32))
+        _, _, _, (left, top, width, height) = cv2.floodFill(
+            pixels, None, (int(x), int(y)), replacement, flags=4)
+        return left, top, left + width - 1, top + height - 1
+    
+    return fill
+
+
+_fill_kernel = None
+
+
+def flood_fill(pixels, x, y, target, replacement):
+    """Flood fills a 2D array in place and returns the filled bounding box"""
+    global _fill_kernel
+    
+    # When the whole array is the target color, as on a blank frame, the
+    # region is everything and can be filled in one bulk write
+    height, width = pixels.shape
+    if pixels[0, 0] == target and pixels[-1, -1] == target and (pixels == target).all():
+        pixels[:] = replacement
+        return 0, 0, width - 1, height - 1
+    
+    if _fill_kernel is None:
+        # OpenCV and Numba are optional and only imported on the first fill,
+        # so they don't slow down application startup
+        try:
+            import cv2
+            _fill_kernel = opencv_kernel(cv2)
+        except ImportError:
+            try:
+                import numba
+                _fill_kernel = numba.njit(cache=True, boundscheck=False)(scanline_fill)
+            except ImportError:
+                _fill_kernel = scanline_fill_numpy
+    return _fill_kernel(pixels, x, y, target, replacement)
@@ -2,9 +2,49 @@
 Canvas module for drawing animation frames
 """
 
+import math
+from functools import lru_cache
+
+import numpy as np
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import (QPixmap, QPainter, QPen, QColor, QImage, QLinearGradient, QPainterPath, QBrush, QCursor)
-from PyQt5.QtCore import Qt, QPoint, QRect
+from PyQt5.QtGui import (QPixmap, QPainter, QPen, QColor, QImage, QPolygon, QBrush, QCursor)
+from PyQt5.QtCore import Qt, QPoint, QRect, QTimer, QByteArray, QBuffer, QIODevice
+
+from src.gui._fill import flood_fill
+
+# Opaque white as a packed 0xAARRGGBB pixel, for filling images directly
+WHITE_PIXEL = 0xFFFFFFFF
+
+# PNG quality that makes Qt use zlib level 1, which encodes about 40%
+# faster than the default for a slightly larger file. Qt 5 maps quality
+# inversely onto zlib levels, so 80 gives level 1 while a low quality
+# like 1 gives level 9, the smallest and slowest encode.
+# QImageWriter.setCompression is scaled the other way round, with higher
+# values compressing more.
+FAST_PNG_QUALITY = 80
+
+
+def encode_png(image, quality=-1):
+    """Returns the image encoded as PNG data"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG", quality)
+    buffer.close()
+    return data
+
+
+@lru_cache(maxsize=64)
+def _brush_cursor(size, rgba):
+    """Returns a cursor drawn as a circle of the brush size and color"""
+    pixmap = QPixmap(size + 2, size + 2)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    painter.setPen(Qt.black)
+    painter.setBrush(QBrush(QColor.fromRgba(rgba)))
+    painter.drawEllipse(1, 1, size, size)
+    painter.end()
+    return QCursor(pixmap)
 
 
 class Canvas(QWidget):
@@ -17,33 +57,55 @@ class Canvas(QWidget):
         # Set initial size
         self.setMinimumSize(800, 600)
         
-        # Initialize single image with correct size
-        self.image = QImage(800, 600, QImage.Format_ARGB32)
-        self.image.fill(Qt.white)
+        # Initialize single image with correct size. The canvas is always
+        # opaque, so RGB32 lets Qt skip alpha blending when drawing it.
+        self.image = QImage(800, 600, QImage.Format_RGB32)
+        self.image.fill(WHITE_PIXEL)
+        
+        # The image is the editable copy; this pixmap mirrors it for display
+        # so repaints can use the platform's fast pixmap blits
+        self.display_pixmap = QPixmap.fromImage(self.image)
         
         # Keep track of canvas size to handle scaling
         self.canvas_width = 800
         self.canvas_height = 600
+        self.update_scale()
         
         # Undo/Redo stacks
         self.undo_stack = []
         self.redo_stack = []
         self.max_history = 20
+        self.hot_history = 3  # Newer entries stay uncompressed
         
         # Drawing settings
         self.drawing = False
         self.brush_size = 3
-        self.brush_color = Qt.black
+        self.brush_color = QColor(Qt.black)
         self.last_point = QPoint()
         self.current_tool = "pen"
+        self.stroke_painter = None
+        
+        # Mouse positions are queued and drawn together about once a frame
+        self.pending_points = []
+        self.stroke_timer = QTimer(self)
+        self.stroke_timer.setSingleShot(True)
+        self.stroke_timer.setInterval(16)
+        self.stroke_timer.timeout.connect(self.flush_stroke)
+        
+        # Image before the current stroke and the area the stroke changed
+        self.stroke_base = None
+        self.dirty_rect = QRect()
         
         # Eraser settings
-        self.eraser_color = Qt.white
+        self.eraser_color = QColor(Qt.white)
         self.eraser_size = 10
         
         # Gradient fill settings
-        self.gradient_start_color = Qt.red
-        self.gradient_end_color = Qt.blue
+        self.gradient_start_color = QColor(Qt.red)
+        self.gradient_end_color = QColor(Qt.blue)
+        
+        # While the animation plays, loaded frames are only displayed
+        self.playback_mode = False
         
         # Set up the cursor
         self.update_cursor()
@@ -61,21 +123,13 @@ class Canvas(QWidget):
             self.setCursor(Qt.ArrowCursor)
             return
         
-        # Create a custom cursor for the brush/eraser
-        pixmap = QPixmap(size + 2, size + 2)
-        pixmap.fill(Qt.transparent)
-        painter = QPainter(pixmap)
-        painter.setPen(Qt.black)
-        painter.setBrush(QBrush(color))
-        painter.drawEllipse(1, 1, size, size)
-        painter.end()
-        
-        self.setCursor(QCursor(pixmap))
+        # Cursors are cached, so slider drags mostly reuse existing ones
+        self.setCursor(_brush_cursor(size, color.rgba()))
     
     def set_gradient_colors(self, start_color, end_color):
         """Sets the gradient start and end colors"""
-        self.gradient_start_color = start_color
-        self.gradient_end_color = end_color
+        self.gradient_start_color = QColor(start_color)
+        self.gradient_end_color = QColor(end_color)
     
     def set_brush_size(self, size):
         """Sets the brush size"""
@@ -84,7 +138,7 @@ class Canvas(QWidget):
     
     def set_brush_color(self, color):
         """Sets the brush color"""
-        self.brush_color = color
+        self.brush_color = QColor(color)
         self.update_cursor()
     
     def set_tool(self, tool):
@@ -95,52 +149,95 @@ class Canvas(QWidget):
     def clear(self):
         """Clears the canvas"""
         self.save_state()  # Save current state for undo
-        self.image.fill(Qt.white)
-        self.update()
+        self.image.fill(WHITE_PIXEL)
+        self.refresh_display()
     
     def load_image(self, image):
         """Loads an image onto the canvas"""
-        self.save_state()  # Save current state for undo
-        self.image = image.copy()
+        self.end_stroke()
+        if not self.playback_mode:
+            self.save_state()  # Save current state for undo
+        self.image = image.convertToFormat(QImage.Format_RGB32)
         self.canvas_width = self.image.width()
         self.canvas_height = self.image.height()
-        self.update()
+        self.update_scale()
+        self.refresh_display()
     
     def get_image(self):
-        """Returns the current canvas image"""
-        return self.image.copy()
+        """Returns the current canvas image.
+        
+        The returned image shares its data with the canvas until either one
+        is modified, so no pixels are copied here.
+        """
+        self.end_stroke()
+        return QImage(self.image)
     
     def save_state(self):
         """Saves the current canvas state for undo"""
-        self.undo_stack.append(self.image.copy())
+        # QImage is implicitly shared, so pixels are only copied once the
+        # canvas image is changed
+        self.push_undo(None, QImage(self.image))
+    
+    def push_undo(self, rect, image):
+        """Pushes an undo entry that restores image at rect (None for the whole canvas)"""
+        self.undo_stack.append((rect, image))
         if len(self.undo_stack) > self.max_history:
             self.undo_stack.pop(0)
         self.redo_stack.clear()
+        
+        # Older entries are kept PNG-compressed, which is far smaller for
+        # mostly blank drawings and only costs a decode if they are undone
+        if len(self.undo_stack) > self.hot_history:
+            index = len(self.undo_stack) - self.hot_history - 1
+            old_rect, old_image = self.undo_stack[index]
+            if isinstance(old_image, QImage):
+                self.undo_stack[index] = (old_rect, encode_png(old_image, FAST_PNG_QUALITY))
+    
+    def restore_state(self, rect, image):
+        """Restores an undo or redo entry and returns the entry that reverses it"""
+        if isinstance(image, QByteArray):
+            image = QImage.fromData(image, "PNG")
+        
+        if rect is None:
+            previous = (None, self.image)
+            self.image = image
+            self.canvas_width = self.image.width()
+            self.canvas_height = self.image.height()
+            self.update_scale()
+            self.refresh_display()
+            return previous
+        
+        previous = (rect, self.image.copy(rect))
+        painter = QPainter(self.image)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawImage(rect.topLeft(), image)
+        painter.end()
+        self.update_image_rect(rect)
+        return previous
     
     def undo(self):
         """Reverts to the previous state"""
+        self.end_stroke()
         if self.undo_stack:
-            self.redo_stack.append(self.image.copy())
-            self.image = self.undo_stack.pop()
-            self.update()
+            self.redo_stack.append(self.restore_state(*self.undo_stack.pop()))
     
     def redo(self):
         """Restores an undone action"""
+        self.end_stroke()
         if self.redo_stack:
-            self.undo_stack.append(self.image.copy())
-            self.image = self.redo_stack.pop()
-            self.update()
+            self.undo_stack.append(self.restore_state(*self.redo_stack.pop()))
     
     def resize_canvas(self, width, height):
         """Resizes the canvas while preserving existing drawings"""
         if width == self.canvas_width and height == self.canvas_height:
             return  # No change needed
         
+        self.end_stroke()
         self.save_state()  # Save current state for undo
         
         # Create a new blank image
-        new_image = QImage(width, height, QImage.Format_ARGB32)
-        new_image.fill(Qt.white)
+        new_image = QImage(width, height, QImage.Format_RGB32)
+        new_image.fill(WHITE_PIXEL)
         
         # Copy existing drawing into the new image
         painter = QPainter(new_image)
@@ -151,15 +248,67 @@ class Canvas(QWidget):
         self.canvas_width = width
         self.canvas_height = height
         self.setFixedSize(width, height)
+        self.update_scale()
+        self.refresh_display()
+    
+    def get_image_array(self):
+        """Returns a writable uint32 view of the canvas pixels, shaped (height, width)"""
+        if self.image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32):
+            self.image = self.image.convertToFormat(QImage.Format_RGB32)
+        
+        # bits() detaches the image, so the view never writes into a shared copy
+        ptr = self.image.bits()
+        ptr.setsize(self.image.height() * self.image.bytesPerLine())
+        pixels = np.frombuffer(ptr, dtype=np.uint32)
+        pixels = pixels.reshape(self.image.height(), self.image.bytesPerLine() // 4)
+        return pixels[:, :self.image.width()]
+    
+    def refresh_display(self):
+        """Rebuilds the display pixmap from the whole image and repaints"""
+        self.display_pixmap = QPixmap.fromImage(self.image)
         self.update()
     
+    def update_image_rect(self, rect):
+        """Copies an image rectangle to the display pixmap and repaints it"""
+        painter = QPainter(self.display_pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawImage(rect, self.image, rect)
+        painter.end()
+        
+        if self.unscaled:
+            self.update(rect)
+            return
+        
+        left = math.floor(rect.x() / self.scale_x)
+        top = math.floor(rect.y() / self.scale_y)
+        right = math.ceil((rect.x() + rect.width()) / self.scale_x)
+        bottom = math.ceil((rect.y() + rect.height()) / self.scale_y)
+        self.update(QRect(left, top, right - left, bottom - top))
+    
+    def mark_dirty(self, rect):
+        """Records an image area changed by the current stroke and repaints it"""
+        self.dirty_rect = self.dirty_rect.united(rect)
+        self.update_image_rect(rect)
+    
+    def update_scale(self):
+        """Caches the ratio of image pixels to widget pixels"""
+        self.scale_x = self.canvas_width / self.width()
+        self.scale_y = self.canvas_height / self.height()
+        self.unscaled = self.scale_x == 1.0 and self.scale_y == 1.0
+    
+    def resizeEvent(self, event):
+        """Handles resize events for the canvas"""
+        super().resizeEvent(event)
+        self.update_scale()
+    
     def get_image_position(self, widget_pos):
         """Converts widget coordinates to image coordinates"""
         # If widget and image sizes match, just return the position
+        if self.unscaled:
+            return widget_pos
+        
         # Otherwise, scale to match image coordinates
-        x = int(widget_pos.x() * self.canvas_width / self.width())
-        y = int(widget_pos.y() * self.canvas_height / self.height())
-        return QPoint(x, y)
+        return QPoint(int(widget_pos.x() * self.scale_x), int(widget_pos.y() * self.scale_y))
     
     def mousePressEvent(self, event):
         """Handles mouse press events on the canvas"""
@@ -167,7 +316,11 @@ class Canvas(QWidget):
             self.drawing = True
             # Convert widget coordinates to image coordinates
             self.last_point = self.get_image_position(event.pos())
-            self.save_state()
+            
+            # Keep a shallow copy of the image from before the stroke. Only
+            # the area the stroke changes is copied out of it for undo.
+            self.stroke_base = QImage(self.image)
+            self.dirty_rect = QRect()
     
     def mouseMoveEvent(self, event):
         """Handles mouse move events on the canvas"""
@@ -175,16 +328,22 @@ class Canvas(QWidget):
             # Convert widget coordinates to image coordinates
             current_point = self.get_image_position(event.pos())
             
-            if self.current_tool == "pen":
-                self.draw_line_to(current_point)
-            elif self.current_tool == "eraser":
-                self.erase_to(current_point)
+            # Moves that stay on the same image pixel have nothing to draw
+            last_point = self.pending_points[-1] if self.pending_points else self.last_point
+            if current_point == last_point:
+                return
+            
+            if self.current_tool in ("pen", "eraser"):
+                self.pending_points.append(current_point)
+                if not self.stroke_timer.isActive():
+                    self.stroke_timer.start()
     
     def mouseReleaseEvent(self, event):
         """Handles mouse release events on the canvas"""
         if event.button() == Qt.LeftButton and self.drawing:
             # Convert widget coordinates to image coordinates
             current_point = self.get_image_position(event.pos())
+            self.flush_stroke()
             
             if self.current_tool == "pen":
                 self.draw_line_to(current_point)
@@ -195,162 +354,151 @@ class Canvas(QWidget):
             elif self.current_tool == "gradient":
                 self.fill_gradient(current_point)
             
-            self.drawing = False
+            self.end_stroke()
+    
+    def begin_stroke(self, width, color):
+        """Opens the painter used for every segment of a pen or eraser stroke"""
+        pen = QPen()
+        pen.setWidth(width)
+        pen.setColor(color)
+        pen.setCapStyle(Qt.RoundCap)
+        pen.setJoinStyle(Qt.RoundJoin)
+        
+        self.stroke_painter = QPainter(self.image)
+        self.stroke_painter.setPen(pen)
+    
+    def flush_stroke(self):
+        """Draws the mouse positions queued since the last flush as one polyline"""
+        self.stroke_timer.stop()
+        if not self.pending_points:
+            return
+        
+        if self.current_tool == "eraser":
+            width, color = self.eraser_size, self.eraser_color
+        else:
+            width, color = self.brush_size, self.brush_color
+        if self.stroke_painter is None:
+            self.begin_stroke(width, color)
+        
+        polyline = QPolygon([self.last_point] + self.pending_points)
+        self.stroke_painter.drawPolyline(polyline)
+        
+        # Only repaint the area covered by the new segments
+        pad = width // 2 + 2
+        dirty = polyline.boundingRect().adjusted(-pad, -pad, pad, pad)
+        self.last_point = self.pending_points[-1]
+        self.pending_points = []
+        self.mark_dirty(dirty)
+    
+    def end_stroke(self):
+        """Finishes the current stroke and saves the area it changed for undo"""
+        self.flush_stroke()
+        if self.stroke_painter is not None:
+            self.stroke_painter.end()
+            self.stroke_painter = None
+        
+        if self.stroke_base is not None:
+            rect = self.dirty_rect.intersected(self.stroke_base.rect())
+            if not rect.isEmpty():
+                self.push_undo(rect, self.stroke_base.copy(rect))
+            self.stroke_base = None
+        
+        self.dirty_rect = QRect()
+        self.drawing = False
     
     def draw_line_to(self, end_point):
         """Draws a line from the last point to the current point"""
         if self.image.isNull():
             return
         
-        painter = QPainter(self.image)
-        pen = QPen()
-        pen.setWidth(self.brush_size)
-        pen.setColor(self.brush_color)
-        pen.setCapStyle(Qt.RoundCap)
-        pen.setJoinStyle(Qt.RoundJoin)
-        painter.setPen(pen)
+        if self.stroke_painter is None:
+            self.begin_stroke(self.brush_size, self.brush_color)
+        self.stroke_painter.drawLine(self.last_point, end_point)
         
-        painter.drawLine(self.last_point, end_point)
+        # Only repaint the area covered by the new segment
+        pad = self.brush_size // 2 + 2
+        dirty = QRect(self.last_point, end_point).normalized().adjusted(-pad, -pad, pad, pad)
         self.last_point = end_point
-        self.update()
+        self.mark_dirty(dirty)
     
     def erase_to(self, end_point):
         """Erases from the last point to the current point"""
-        painter = QPainter(self.image)
-        pen = QPen()
-        pen.setWidth(self.eraser_size)
-        pen.setColor(self.eraser_color)
-        pen.setCapStyle(Qt.RoundCap)
-        pen.setJoinStyle(Qt.RoundJoin)
-        painter.setPen(pen)
+        if self.stroke_painter is None:
+            self.begin_stroke(self.eraser_size, self.eraser_color)
+        self.stroke_painter.drawLine(self.last_point, end_point)
         
-        painter.drawLine(self.last_point, end_point)
+        # Only repaint the area covered by the new segment
+        pad = self.eraser_size // 2 + 2
+        dirty = QRect(self.last_point, end_point).normalized().adjusted(-pad, -pad, pad, pad)
         self.last_point = end_point
-        self.update()
+        self.mark_dirty(dirty)
     
     def fill_at(self, point):
         """Fills an area with the current brush color starting at the given point"""
-        # Create a copy of the image for processing
-        src_image = self.image.copy()
         x, y = point.x(), point.y()
         
         # Get the target color to replace
         if not (0 <= x < self.canvas_width and 0 <= y < self.canvas_height):
             return
         
-        target_color = src_image.pixelColor(x, y)
-        replacement_color = self.brush_color
+        pixels = self.get_image_array()
+        target = pixels[y, x]
+        replacement = self.brush_color.rgba() | 0xFF000000
         
         # Don't do anything if the colors are the same
-        if target_color == replacement_color:
+        if target == replacement:
             return
         
-        # Simple flood fill algorithm (4-connected)
-        stack = [(x, y)]
-        width, height = src_image.width(), src_image.height()
-        visited = set()
-        
-        # Create painter
-        painter = QPainter(self.image)
-        painter.setPen(QPen(replacement_color))
-        
-        while stack:
-            cx, cy = stack.pop()
-            if (cx, cy) in visited:
-                continue
-            
-            current_color = src_image.pixelColor(cx, cy)
-            if current_color != target_color:
-                continue
-            
-            # Fill this pixel
-            painter.drawPoint(cx, cy)
-            visited.add((cx, cy))
-            
-            # Add adjacent pixels
-            directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-            for dx, dy in directions:
-                nx, ny = cx + dx, cy + dy
-                if (0 <= nx < width and 0 <= ny < height and 
-                        (nx, ny) not in visited):
-                    stack.append((nx, ny))
-        
-        painter.end()
-        self.update()
+        min_x, min_y, max_x, max_y = flood_fill(pixels, x, y, target, replacement)
+        self.mark_dirty(QRect(QPoint(min_x, min_y), QPoint(max_x, max_y)))
     
     def fill_gradient(self, point):
         """Fills an enclosed shape with a gradient starting from the clicked point"""
-        # Create a copy of the image for processing
-        src_image = self.image.copy()
         x, y = point.x(), point.y()
         
         # Ensure the point is within bounds
         if not (0 <= x < self.canvas_width and 0 <= y < self.canvas_height):
             return
         
-        target_color = src_image.pixelColor(x, y)
+        pixels = self.get_image_array()
+        target = pixels[y, x]
         
         # Don't apply if clicking on the same color
-        if target_color == self.gradient_start_color or target_color == self.gradient_end_color:
+        if (target == self.gradient_start_color.rgba() or
+                target == self.gradient_end_color.rgba()):
             return
         
-        # Create a mask to track filled area
-        width, height = src_image.width(), src_image.height()
-        mask = [[False] * height for _ in range(width)]
-        
-        # Simple flood fill algorithm (4-connected)
-        stack = [(x, y)]
-        shape_bounds = []  # Store the boundary of the shape
-        
-        while stack:
-            cx, cy = stack.pop()
-            if not (0 <= cx < width and 0 <= cy < height) or mask[cx][cy]:
-                continue
-            
-            current_color = src_image.pixelColor(cx, cy)
-            if current_color != target_color:
-                continue
-            
-            # Mark this pixel as filled
-            mask[cx][cy] = True
-            shape_bounds.append((cx, cy))
-            
-            # Add adjacent pixels to the stack
-            directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-            for dx, dy in directions:
-                nx, ny = cx + dx, cy + dy
-                stack.append((nx, ny))
-        
-        if not shape_bounds:
-            return
-        
-        # Find bounding box of the shape
-        min_x = min(px for px, _ in shape_bounds)
-        max_x = max(px for px, _ in shape_bounds)
-        min_y = min(py for _, py in shape_bounds)
-        max_y = max(py for _, py in shape_bounds)
-        
-        # Create a gradient inside the detected shape boundary
-        gradient = QLinearGradient(min_x, min_y, max_x, max_y)
-        gradient.setColorAt(0, self.gradient_start_color)
-        gradient.setColorAt(1, self.gradient_end_color)
-        
-        painter = QPainter(self.image)
-        painter.setBrush(QBrush(gradient))
-        painter.setPen(Qt.NoPen)
-        
-        # Fill the detected shape using a path
-        path = QPainterPath()
-        for px, py in shape_bounds:
-            path.addRect(px, py, 1, 1)  # Fill pixel by pixel
-        
-        painter.fillPath(path, gradient)
-        painter.end()
-        
-        self.update()
+        # Flood fill a label image (1 = target color) to get the shape's mask
+        labels = (pixels == target).view(np.uint8)
+        min_x, min_y, max_x, max_y = flood_fill(labels, x, y, 1, 2)
+        
+        # Coordinates of the filled pixels, relative to the shape's bounding box
+        ys, xs = np.nonzero(labels[min_y:max_y + 1, min_x:max_x + 1] == 2)
+        
+        # Position of each pixel along the gradient line, which runs
+        # diagonally across the shape's bounding box
+        dx, dy = max_x - min_x, max_y - min_y
+        t = (xs * dx + ys * dy).astype(np.float32)
+        if dx or dy:
+            t /= dx * dx + dy * dy
+        
+        # Pack 256 steps of the gradient once, then look each pixel's color up
+        start = np.array(self.gradient_start_color.getRgb()[:3], dtype=np.float32)
+        end = np.array(self.gradient_end_color.getRgb()[:3], dtype=np.float32)
+        steps = np.linspace(0, 1, 256, dtype=np.float32)[:, None]
+        red, green, blue = np.rint(start + steps * (end - start)).astype(np.uint32).T
+        ramp = 0xFF000000 | (red << 16) | (green << 8) | blue
+        pixels[ys + min_y, xs + min_x] = ramp[np.rint(t * 255).astype(np.uint8)]
+        
+        self.mark_dirty(QRect(QPoint(min_x, min_y), QPoint(max_x, max_y)))
     
     def paintEvent(self, event):
         """Handles paint events for the canvas"""
         painter = QPainter(self)
-        # Draw the image scaled to fit the widget
-        painter.drawImage(self.rect(), self.image)
\ No newline at end of file
+        rect = event.rect()
+        if self.size() == self.display_pixmap.size():
+            # Only copy the part of the image that needs repainting
+            painter.drawPixmap(rect, self.display_pixmap, rect)
+        else:
+            # Draw the image scaled to fit the widget
+            painter.drawPixmap(self.rect(), self.display_pixmap)
\ No newline at end of file
@@ -7,6 +7,8 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PyQt5.QtGui import QPixmap, QImage, QIcon
 from PyQt5.QtCore import Qt, QSize, pyqtSignal, QTimer
 
+from src.gui.frame_store import FrameStore
+
 class FrameManager(QWidget):
     """Widget to manage animation frames"""
     frame_changed = pyqtSignal(int)
@@ -14,7 +16,7 @@ class FrameManager(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
-        self.frames = []
+        self.frames = FrameStore()
         self.current_frame_index = -1
         self.fps = 12
         
@@ -68,6 +70,13 @@ class FrameManager(QWidget):
         self.layout.addLayout(btn_layout)
         self.layout.addLayout(fps_layout)
         
+        # New frames share this blank image until they are drawn on
+        self.blank_frame = QImage(800, 600, QImage.Format_RGB32)
+        self.blank_frame.fill(Qt.white)
+        
+        # Blank frames all show the same thumbnail, so it is scaled only once
+        self.blank_icon = QIcon(QPixmap.fromImage(self.create_thumbnail(self.blank_frame)))
+        
         # Initialize with one empty frame
         self.add_frame()
     
@@ -78,22 +87,17 @@ class FrameManager(QWidget):
     def add_frame(self):
         """Adds a new blank frame to the animation"""
         if self.current_frame_index >= 0 and self.frames:
-            # Save the current canvas image as a deep copy
-            current_image = self.parent.canvas.get_image()
-            self.frames[self.current_frame_index] = current_image.copy()
-        
-        # Create a blank white frame
-        new_frame = QImage(800, 600, QImage.Format_ARGB32)
-        new_frame.fill(Qt.white)
+            # Save the current canvas image
+            self.update_current_frame(self.parent.canvas.get_image())
         
-        # Store a new independent frame copy
-        self.frames.append(new_frame.copy())
+        # Create a blank white frame, sharing the pixels of the blank image
+        new_frame = QImage(self.blank_frame)
+        self.frames.append(new_frame)
         
         # Update UI
         index = len(self.frames) - 1
-        thumbnail = self.create_thumbnail(new_frame)
         item = QListWidgetItem(f"Frame {index + 1}")
-        item.setIcon(QIcon(QPixmap.fromImage(thumbnail)))
+        item.setIcon(self.blank_icon)
         self.frame_list.addItem(item)
         
         # Select the new frame
@@ -101,7 +105,7 @@ class FrameManager(QWidget):
         self.current_frame_index = index
         
         # Load the blank frame onto the canvas
-        self.parent.canvas.load_image(new_frame.copy())
+        self.parent.canvas.load_image(new_frame)
         self.frame_changed.emit(index)
     
     def duplicate_frame(self):
@@ -110,11 +114,10 @@ class FrameManager(QWidget):
             return
             
         # Save the current canvas state to the current frame
-        current_image = self.parent.canvas.get_image()
-        self.frames[self.current_frame_index] = current_image.copy()
+        self.update_current_frame(self.parent.canvas.get_image())
             
-        # Create a deep copy of the current frame
-        frame_copy = self.frames[self.current_frame_index].copy()
+        # The duplicate shares the frame's pixels until either one is edited
+        frame_copy = QImage(self.frames[self.current_frame_index])
         
         # Insert after the current frame
         insert_position = self.current_frame_index + 1
@@ -132,7 +135,7 @@ class FrameManager(QWidget):
         # Select the new frame
         self.frame_list.setCurrentRow(insert_position)
         self.current_frame_index = insert_position
-        self.parent.canvas.load_image(frame_copy.copy())
+        self.parent.canvas.load_image(frame_copy)
         self.frame_changed.emit(insert_position)
     
     def delete_frame(self):
@@ -146,7 +149,7 @@ class FrameManager(QWidget):
             return
             
         # Remove from list and frames
-        self.frames.pop(self.current_frame_index)
+        del self.frames[self.current_frame_index]
         self.frame_list.takeItem(self.current_frame_index)
         
         # Update frame numbering
@@ -159,7 +162,7 @@ class FrameManager(QWidget):
         
         # Load the new current frame onto the canvas
         if self.frames:
-            self.parent.canvas.load_image(self.frames[new_index].copy())
+            self.parent.canvas.load_image(self.frames[new_index])
         self.frame_changed.emit(new_index)
     
     def move_frame_left(self):
@@ -169,21 +172,21 @@ class FrameManager(QWidget):
             return
         
         # Save the current canvas state to the current frame
-        current_image = self.parent.canvas.get_image()
-        self.frames[self.current_frame_index] = current_image.copy()
+        self.update_current_frame(self.parent.canvas.get_image())
             
         # Swap frames
         new_index = self.current_frame_index - 1
-        self.frames[new_index], self.frames[self.current_frame_index] = \
-            self.frames[self.current_frame_index].copy(), self.frames[new_index].copy()
+        self.frames.swap(new_index, self.current_frame_index)
             
-        # Update UI to reflect changes
-        self.refresh_frame_list()
+        # Move the list item along with its frame, keeping its thumbnail
+        item = self.frame_list.takeItem(self.current_frame_index)
+        self.frame_list.insertItem(new_index, item)
+        self.renumber_frames()
         
         # Select the moved frame
         self.frame_list.setCurrentRow(new_index)
         self.current_frame_index = new_index
-        self.parent.canvas.load_image(self.frames[new_index].copy())
+        self.parent.canvas.load_image(self.frames[new_index])
         self.frame_changed.emit(new_index)
     
     def move_frame_right(self):
@@ -193,33 +196,23 @@ class FrameManager(QWidget):
             return
         
         # Save the current canvas state to the current frame
-        current_image = self.parent.canvas.get_image()
-        self.frames[self.current_frame_index] = current_image.copy()
+        self.update_current_frame(self.parent.canvas.get_image())
             
         # Swap frames
         new_index = self.current_frame_index + 1
-        self.frames[new_index], self.frames[self.current_frame_index] = \
-            self.frames[self.current_frame_index].copy(), self.frames[new_index].copy()
+        self.frames.swap(new_index, self.current_frame_index)
             
-        # Update UI to reflect changes
-        self.refresh_frame_list()
+        # Move the list item along with its frame, keeping its thumbnail
+        item = self.frame_list.takeItem(self.current_frame_index)
+        self.frame_list.insertItem(new_index, item)
+        self.renumber_frames()
         
         # Select the moved frame
         self.frame_list.setCurrentRow(new_index)
         self.current_frame_index = new_index
-        self.parent.canvas.load_image(self.frames[new_index].copy())
+        self.parent.canvas.load_image(self.frames[new_index])
         self.frame_changed.emit(new_index)
     
-    def refresh_frame_list(self):
-        """Refreshes the frame list to reflect the current state of frames"""
-        self.frame_list.clear()
-        
-        for i, frame in enumerate(self.frames):
-            thumbnail = self.create_thumbnail(frame)
-            item = QListWidgetItem(f"Frame {i + 1}")
-            item.setIcon(QIcon(QPixmap.fromImage(thumbnail)))
-            self.frame_list.addItem(item)
-    
     def renumber_frames(self):
         """Updates frame numbers in the list widget"""
         for i in range(self.frame_list.count()):
@@ -229,8 +222,7 @@ class FrameManager(QWidget):
         """Handles frame selection from the list"""
         # Save the current frame before switching
         if self.current_frame_index >= 0 and self.current_frame_index < len(self.frames):
-            current_image = self.parent.canvas.get_image()
-            self.frames[self.current_frame_index] = current_image.copy()
+            self.update_current_frame(self.parent.canvas.get_image())
             
         # Switch to the selected frame
         index = self.frame_list.row(item)
@@ -238,7 +230,7 @@ class FrameManager(QWidget):
         
         # Load the selected frame onto the canvas
         if index >= 0 and index < len(self.frames):
-            self.parent.canvas.load_image(self.frames[index].copy())
+            self.parent.canvas.load_image(self.frames[index])
             
         self.frame_changed.emit(index)
     
@@ -248,10 +240,13 @@ class FrameManager(QWidget):
     
     def update_current_frame(self, image):
         """Updates the current frame with a new image"""
-        if not self.frames or self.current_frame_index < 0:
+        if not 0 <= self.current_frame_index < len(self.frames):
             return
-            
-        self.frames[self.current_frame_index] = image.copy()
+        
+        # An unedited frame keeps its stored image and thumbnail
+        if self.frames.holds(self.current_frame_index, image):
+            return
+        self.frames[self.current_frame_index] = image
         
         # Update thumbnail
         thumbnail = self.create_thumbnail(image)
@@ -262,7 +257,7 @@ class FrameManager(QWidget):
         """Returns the current frame image"""
         if not self.frames or self.current_frame_index < 0:
             return None
-        return self.frames[self.current_frame_index].copy()
+        return QImage(self.frames[self.current_frame_index])
     
     def play_animation(self):
         """Starts playing the animation preview"""
@@ -272,8 +267,7 @@ class FrameManager(QWidget):
 
         # Save the current frame before starting playback
         if self.current_frame_index >= 0 and self.frames:
-            current_image = self.parent.canvas.get_image()
-            self.frames[self.current_frame_index] = current_image.copy()
+            self.update_current_frame(self.parent.canvas.get_image())
 
         self.animation_timer = QTimer(self)
         self.animation_timer.timeout.connect(self.advance_frame)
@@ -282,9 +276,13 @@ class FrameManager(QWidget):
         self.playback_index = 0
         self.old_index = self.current_frame_index
 
+        # Frames shown during playback are not added to the undo history
+        self.parent.canvas.playback_mode = True
+
         # Load the first frame for playback
         if self.frames:
-            self.parent.canvas.load_image(self.frames[0].copy())
+            self.parent.canvas.load_image(self.frames[0])
+            self.frames.prefetch(1 % len(self.frames))
 
     
     def stop_animation(self):
@@ -295,7 +293,8 @@ class FrameManager(QWidget):
             self.frame_list.setCurrentRow(self.old_index)
             self.current_frame_index = self.old_index
             if self.old_index >= 0 and self.old_index < len(self.frames):
-                self.parent.canvas.load_image(self.frames[self.old_index].copy())
+                self.parent.canvas.load_image(self.frames[self.old_index])
+            self.parent.canvas.playback_mode = False
             self.frame_changed.emit(self.old_index)
     
     def advance_frame(self):
@@ -306,6 +305,8 @@ class FrameManager(QWidget):
         self.playback_index = (self.playback_index + 1) % len(self.frames)
         self.frame_list.setCurrentRow(self.playback_index)
         # During playback, don't save frames, just display them
-        self.parent.canvas.load_image(self.frames[self.playback_index].copy())
+        self.parent.canvas.load_image(self.frames[self.playback_index])
+        # Decode the next frame in the background if it is on disk
+        self.frames.prefetch((self.playback_index + 1) % len(self.frames))
         self.current_frame_index = self.playback_index
         self.frame_changed.emit(self.playback_index)
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Frame store module for keeping animation frames partly on disk
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableSequence, Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtGui import QImage
+
+from src.gui.canvas import FAST_PNG_QUALITY, encode_png
+
+class FrameStore(MutableSequence):
+    """List of frames that only keeps the most recently used ones in memory.
+
+    Frames pushed out of the cache are written to PNG files in a temporary
+    directory on a background thread and decoded again when next needed.
+    Every changed image gets a new key, so a frame's file always matches its
+    content and is never rewritten. The store may be read from any thread.
+    """
+
+    def __init__(self, frames=(), cache_size=32):
+        self.cache_size = cache_size
+        self.keys = []
+        self.next_key = 0
+        self.lock = threading.Lock()
+
+        # Decoded frames by key, least recently used first
+        self.cache = OrderedDict()
+        # Frames waiting to be written, and the files of written frames
+        self.pending = {}
+        self.files = {}
+        # QImage cache keys of the stored images, which stay the same until
+        # an image's pixels are changed
+        self.image_keys = {}
+        # Snapshot counts of pinned keys, and pinned keys already removed
+        self.pins = {}
+        self.removed = set()
+
+        self.temp_dir = tempfile.mkdtemp(prefix="atap-frames-")
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        weakref.finalize(self, shutil.rmtree, self.temp_dir, True)
+
+        self.extend(frames)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        # Another thread can replace or remove the frame while it is being
+        # decoded, in which case the frame now at index is read instead
+        while True:
+            with self.lock:
+                key = self.keys[index]
+            image = self.load(key)
+            if image is not None:
+                return image
+
+    def __setitem__(self, index, image):
+        with self.lock:
+            old_key = self.keys[index]
+            if self.image_keys.get(old_key) == image.cacheKey():
+                # The frame is unchanged, so its key and file are kept
+                self.keep(old_key, image)
+                return
+            self.keys[index] = self.add(image)
+            self.discard(old_key)
+
+    def __delitem__(self, index):
+        with self.lock:
+            self.discard(self.keys.pop(index))
+
+    def insert(self, index, image):
+        with self.lock:
+            self.keys.insert(index, self.add(image))
+
+    def append_png(self, data):
+        """Appends a frame from PNG data, which becomes its file as is.
+
+        The frame isn't decoded until it is first read.
+        """
+        with self.lock:
+            key = self.next_key
+            self.next_key += 1
+        path = os.path.join(self.temp_dir, f"{key}.png")
+        with open(path, "wb") as f:
+            f.write(data)
+        with self.lock:
+            self.files[key] = path
+            self.keys.append(key)
+
+    def clear(self):
+        with self.lock:
+            for key in self.keys:
+                self.discard(key)
+            self.keys = []
+
+    def swap(self, first, second):
+        """Swaps two frames without touching their pixels"""
+        with self.lock:
+            self.keys[first], self.keys[second] = self.keys[second], self.keys[first]
+
+    def snapshot(self):
+        """Returns a read-only copy of the frame list for another thread.
+
+        The frames in it stay readable however the store changes, until
+        the snapshot is released.
+        """
+        with self.lock:
+            keys = list(self.keys)
+            for key in keys:
+                self.pins[key] = self.pins.get(key, 0) + 1
+        return FrameSnapshot(self, keys)
+
+    def release(self, keys):
+        """Unpins the keys of a snapshot, removing frames that are gone"""
+        with self.lock:
+            for key in keys:
+                self.pins[key] -= 1
+                if not self.pins[key]:
+                    del self.pins[key]
+                    if key in self.removed:
+                        self.removed.remove(key)
+                        self.discard(key)
+
+    def prefetch(self, index):
+        """Starts decoding a frame on the writer thread if it isn't in memory"""
+        with self.lock:
+            key = self.keys[index]
+            if key in self.cache or key in self.pending:
+                return
+        self.writer.submit(self.load, key)
+
+    def holds(self, index, image):
+        """Returns whether the frame at index is this image, unchanged"""
+        with self.lock:
+            return self.image_keys.get(self.keys[index]) == image.cacheKey()
+
+    def png_data(self, index):
+        """Returns a frame encoded as PNG, reusing its file when it has one"""
+        with self.lock:
+            key = self.keys[index]
+            path = self.files.get(key)
+        if path is not None:
+            with open(path, "rb") as f:
+                return f.read()
+        return encode_png(self[index], FAST_PNG_QUALITY).data()
+
+    def load(self, key):
+        """Returns the image for a key, or None if the frame has been removed"""
+        with self.lock:
+            image = self.cache.get(key)
+            if image is not None:
+                self.cache.move_to_end(key)
+                return image
+            image = self.pending.get(key)
+            path = self.files.get(key)
+            if image is None and path is None:
+                return None
+
+        # Decode outside the lock so other threads aren't held up
+        if image is None:
+            image = QImage(path, "PNG")
+
+        with self.lock:
+            if not self.live(key):
+                # Removed while decoding, and its file may be gone with it
+                return None
+            if image.isNull():
+                raise OSError(f"Could not read frame file {path}")
+            self.cache[key] = image
+            self.image_keys[key] = image.cacheKey()
+            self.evict()
+        return image
+
+    def add(self, image):
+        """Caches a new image under a fresh key and returns the key.
+
+        The lock must be held by the caller.
+        """
+        key = self.next_key
+        self.next_key += 1
+        self.cache[key] = QImage(image)
+        self.image_keys[key] = image.cacheKey()
+        self.evict()
+        return key
+
+    def keep(self, key, image):
+        """Marks an unchanged frame as recently used. The lock must be held by the caller."""
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        elif key not in self.pending:
+            # The image is still in use, so caching it again saves a decode
+            self.cache[key] = QImage(image)
+            self.evict()
+
+    def live(self, key):
+        """Returns whether a key is still used. The lock must be held by the caller."""
+        return key in self.pins or key in self.keys
+
+    def discard(self, key):
+        """Forgets a frame's image and file. The lock must be held by the caller."""
+        if key in self.pins:
+            # A snapshot still uses it, so it is removed on release
+            self.removed.add(key)
+            return
+        self.cache.pop(key, None)
+        self.image_keys.pop(key, None)
+        path = self.files.pop(key, None)
+        if path is not None:
+            os.remove(path)
+
+    def evict(self):
+        """Moves frames beyond the cache size to disk. The lock must be held by the caller."""
+        while len(self.cache) > self.cache_size:
+            key, image = self.cache.popitem(last=False)
+            if key not in self.files and key not in self.pending:
+                self.pending[key] = image
+                self.writer.submit(self.write, key, image)
+
+    def write(self, key, image):
+        """Writes an evicted frame to disk, on the writer thread"""
+        path = os.path.join(self.temp_dir, f"{key}.png")
+        image.save(path, "PNG", FAST_PNG_QUALITY)
+        with self.lock:
+            del self.pending[key]
+            if self.live(key):
+                self.files[key] = path
+            else:
+                # The frame was removed while it was being written
+                os.remove(path)
+
+
+class FrameSnapshot(Sequence):
+    """Frames of a FrameStore as they were when the snapshot was taken"""
+
+    def __init__(self, store, keys):
+        self.store = store
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        return self.store.load(self.keys[index])
+
+    def release(self):
+        """Lets the store remove frames that were only kept for this snapshot"""
+        self.store.release(self.keys)
+        self.keys = []
@@ -4,19 +4,49 @@ Main window module for the animation application
 
 import os
 import json
-import shutil
-import tempfile
+import hashlib
 import zipfile
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QApplication,
+import traceback
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QPushButton, QLabel, QSlider, QScrollArea, QColorDialog, QShortcut,
                             QFileDialog, QInputDialog, QMessageBox, QSpinBox, QToolBar,
-                            QAction, QSizePolicy, QDockWidget, QListWidget, QFrame, QListWidgetItem)
-from PyQt5.QtGui import QPixmap, QImage, QColor, QIcon, QKeySequence
-from PyQt5.QtCore import Qt, QRect
+                            QAction, QSizePolicy, QDockWidget, QListWidget, QFrame, QListWidgetItem,
+                            QProgressDialog)
+from PyQt5.QtGui import (QPixmap, QPixmapCache, QImage, QImageReader, QColor, QIcon,
+                         QKeySequence)
+from PyQt5.QtCore import Qt, QRect, QSize, QThread, QTimer, QBuffer, QIODevice
 
-from src.gui.canvas import Canvas
+from src.gui.canvas import FAST_PNG_QUALITY, Canvas, encode_png
 from src.gui.frame_manager import FrameManager
-from src.utils.exporter import AnimationExporter
+
+# orjson is optional; it encodes and decodes the project info much faster
+try:
+    import orjson
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+    json_loads = json.loads
+
+def png_readable(data):
+    """Returns whether data starts like a PNG image, without decoding it"""
+    buffer = QBuffer()
+    buffer.setData(data)
+    buffer.open(QIODevice.ReadOnly)
+    return QImageReader(buffer, b"PNG").canRead()
+
+def color_swatch(color, width, height):
+    """Returns a pixmap filled with the color, shared through QPixmapCache"""
+    key = f"swatch_{color.rgba():08x}_{width}x{height}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        pixmap = QPixmap(width, height)
+        pixmap.fill(color)
+        QPixmapCache.insert(key, pixmap)
+    return pixmap
 
 class MainWindow(QMainWindow):
     """Main application window"""
@@ -39,17 +69,9 @@ class MainWindow(QMainWindow):
         # Create Frame Manager
         self.frame_manager = FrameManager(self)
         
-        # Create Animation Exporter
-        self.exporter = AnimationExporter(self)
-        
-        # Create Tool Dock
-        self.create_tool_dock()
-        
-        # Create Color Dock
-        self.create_color_dock()
-        
-        # Create main toolbar
-        self.create_toolbar()
+        # The animation exporter is created on the first export
+        self.exporter = None
+        self.export_thread = None
         
         # Set up main layout
         canvas_container = QWidget()
@@ -85,6 +107,16 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(self.btn_export)
         
         self.main_layout.addWidget(right_panel, 1)
+        
+        # The docks and toolbar are built once the event loop is running, so
+        # the window and canvas can be shown first
+        QTimer.singleShot(0, self.build_secondary_ui)
+    
+    def build_secondary_ui(self):
+        """Creates the tool dock, color dock and main toolbar"""
+        self.create_tool_dock()
+        self.create_color_dock()
+        self.create_toolbar()
     
     def create_tool_dock(self):
         """Creates the tools dock widget"""
@@ -99,22 +131,22 @@ class MainWindow(QMainWindow):
 
         # Brush tool button
         self.btn_brush = QPushButton("Pen")
-        self.btn_brush.clicked.connect(lambda: self.canvas.set_tool("pen"))
+        self.btn_brush.clicked.connect(partial(self.canvas.set_tool, "pen"))
         layout.addWidget(self.btn_brush)
 
         # Eraser tool button
         self.btn_eraser = QPushButton("Eraser")
-        self.btn_eraser.clicked.connect(lambda: self.canvas.set_tool("eraser"))
+        self.btn_eraser.clicked.connect(partial(self.canvas.set_tool, "eraser"))
         layout.addWidget(self.btn_eraser)
 
         # Fill tool button
         self.btn_fill = QPushButton("Fill")
-        self.btn_fill.clicked.connect(lambda: self.canvas.set_tool("fill"))
+        self.btn_fill.clicked.connect(partial(self.canvas.set_tool, "fill"))
         layout.addWidget(self.btn_fill)
         
         # Gradient Fill button
         self.btn_gradient = QPushButton("Gradient Fill")
-        self.btn_gradient.clicked.connect(lambda: self.canvas.set_tool("gradient"))
+        self.btn_gradient.clicked.connect(partial(self.canvas.set_tool, "gradient"))
         layout.addWidget(self.btn_gradient)
 
         # Clear canvas button
@@ -122,12 +154,18 @@ class MainWindow(QMainWindow):
         self.btn_clear.clicked.connect(self.canvas.clear)
         layout.addWidget(self.btn_clear)
 
+        # Slider moves are applied at most once per frame while dragging
+        self.size_timer = QTimer(self)
+        self.size_timer.setSingleShot(True)
+        self.size_timer.setInterval(16)
+        self.size_timer.timeout.connect(self.apply_sizes)
+
         # Brush size slider
         layout.addWidget(QLabel("Brush Size:"))
         self.brush_slider = QSlider(Qt.Horizontal)
         self.brush_slider.setRange(1, 50)
         self.brush_slider.setValue(3)
-        self.brush_slider.valueChanged.connect(self.canvas.set_brush_size)
+        self.brush_slider.valueChanged.connect(self.schedule_size_update)
         layout.addWidget(self.brush_slider)
 
         # Eraser size slider
@@ -135,13 +173,23 @@ class MainWindow(QMainWindow):
         self.eraser_slider = QSlider(Qt.Horizontal)
         self.eraser_slider.setRange(1, 50)
         self.eraser_slider.setValue(10)
-        self.eraser_slider.valueChanged.connect(lambda x: setattr(self.canvas, 'eraser_size', x))
+        self.eraser_slider.valueChanged.connect(self.schedule_size_update)
         layout.addWidget(self.eraser_slider)
 
         layout.addStretch()
         self.tool_dock.setWidget(tools_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.tool_dock)
 
+    def schedule_size_update(self):
+        """Queues the brush and eraser slider values to be applied"""
+        if not self.size_timer.isActive():
+            self.size_timer.start()
+
+    def apply_sizes(self):
+        """Applies the current brush and eraser slider values to the canvas"""
+        self.canvas.eraser_size = self.eraser_slider.value()
+        self.canvas.set_brush_size(self.brush_slider.value())
+
     def create_color_dock(self):
         """Creates the color selection dock widget"""
         self.color_dock = QDockWidget("Colors", self)
@@ -159,10 +207,12 @@ class MainWindow(QMainWindow):
         self.btn_color = QPushButton("Select Color")
         self.btn_color.clicked.connect(self.open_color_dialog)
         
-        self.color_preview = QFrame()
+        # The preview shows a cached swatch pixmap inside its 1px box, which
+        # is cheaper to update than a stylesheet
+        self.color_preview = QLabel()
         self.color_preview.setFrameShape(QFrame.Box)
         self.color_preview.setFixedSize(40, 20)  # Smaller preview
-        self.color_preview.setStyleSheet("background-color: black;")
+        self.color_preview.setPixmap(color_swatch(QColor(Qt.black), 38, 18))
 
         # Add button and preview to the same row
         color_picker_layout.addWidget(self.btn_color)
@@ -170,9 +220,6 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(color_picker_layout)  # Add the row layout to main layout
 
-        self.color_dock.setWidget(colors_widget)
-        self.addDockWidget(Qt.LeftDockWidgetArea, self.color_dock)
-
         # 🎨 Gradient color selection
         layout.addWidget(QLabel("Gradient Colors:"))
 
@@ -203,6 +250,7 @@ class MainWindow(QMainWindow):
         self.palette_layout = QHBoxLayout()
         
         self.custom_colors = []  # Store selected custom colors
+        self.custom_color_keys = set()  # Their rgba values, for quick lookups
         self.update_custom_palette()
 
         layout.addLayout(self.palette_layout)
@@ -233,9 +281,11 @@ class MainWindow(QMainWindow):
 
     def add_color_to_palette(self, color):
         """Adds a new color to the custom palette"""
-        if color not in self.custom_colors:
+        key = color.rgba()
+        if key not in self.custom_color_keys:
+            self.custom_color_keys.add(key)
             self.custom_colors.append(color)
-            self.update_custom_palette()
+            self.add_palette_button(color)
 
     def update_custom_palette(self):
         """Updates the color palette UI with saved colors"""
@@ -248,11 +298,17 @@ class MainWindow(QMainWindow):
 
         # Add color buttons
         for color in self.custom_colors:
-            color_btn = QPushButton()
-            color_btn.setFixedSize(24, 24)
-            color_btn.setStyleSheet(f"background-color: {color.name()};")
-            color_btn.clicked.connect(lambda checked, c=color: self.set_brush_color(c))
-            self.palette_layout.addWidget(color_btn)
+            self.add_palette_button(color)
+
+    def add_palette_button(self, color):
+        """Adds a button for one color to the end of the palette"""
+        color_btn = QPushButton()
+        color_btn.setFixedSize(24, 24)
+        # A cached swatch icon is cheaper to paint than a stylesheet
+        color_btn.setIcon(QIcon(color_swatch(color, 18, 18)))
+        color_btn.setIconSize(QSize(18, 18))
+        color_btn.clicked.connect(partial(self.set_brush_color, color))
+        self.palette_layout.addWidget(color_btn)
 
     def toggle_tools_dock(self):
         """Toggles the visibility of the Tools dock"""
@@ -333,19 +389,13 @@ class MainWindow(QMainWindow):
         toolbar.addAction(export_action)
 
     
-    def open_color_dialog(self):
-        """Opens a color dialog and sets the selected color"""
-        color = QColorDialog.getColor(self.canvas.brush_color, self)
-        if color.isValid():
-            self.set_brush_color(color)
-    
     def set_brush_color(self, color):
         """Sets the brush color and updates the color preview"""
         self.canvas.set_brush_color(color)
         
         # Ensure color_preview exists before using it
         if hasattr(self, 'color_preview'):
-            self.color_preview.setStyleSheet(f"background-color: {QColor(color).name()};")
+            self.color_preview.setPixmap(color_swatch(QColor(color), 38, 18))
 
     def play_animation(self):
         """Starts the animation preview playback"""
@@ -365,6 +415,11 @@ class MainWindow(QMainWindow):
     
     def export_animation(self):
         """Exports the animation as a video file"""
+        # Only one export can run at a time
+        if self.export_thread is not None:
+            QMessageBox.warning(self, "Export Error", "An export is already in progress.")
+            return
+        
         # Get all frames and FPS
         frames = self.frame_manager.frames
         fps = self.frame_manager.fps
@@ -385,25 +440,73 @@ class MainWindow(QMainWindow):
         if not file_path.lower().endswith('.mp4'):
             file_path += '.mp4'
         
-        # Show a "please wait" message
-        msg = QMessageBox()
-        msg.setText("Exporting animation. Please wait...")
-        msg.setStandardButtons(QMessageBox.NoButton)
-        msg.show()
-        QApplication.processEvents()
-        
-        # Export animation
-        success, message = self.exporter.export_animation(frames, fps, file_path)
-        
-        # Close the "please wait" message
-        msg.close()
-        
-        # Show result
+        # The exporter is only imported when first needed, which keeps it
+        # out of application startup
+        from src.utils.exporter import AnimationExporter, ExportWorker
+        if self.exporter is None:
+            self.exporter = AnimationExporter(self)
+        
+        # The export reads a snapshot of the frames, so the animation can
+        # still be edited while it runs
+        self.frame_manager.update_current_frame(self.canvas.get_image())
+        self.export_frames = frames.snapshot()
+        
+        # Show export progress without blocking the window
+        self.export_dialog = QProgressDialog(
+            "Exporting animation...", "Cancel", 0, len(self.export_frames), self)
+        self.export_dialog.setWindowTitle("Export Animation")
+        self.export_dialog.setMinimumDuration(0)
+        self.export_dialog.setAutoClose(False)
+        self.export_dialog.canceled.connect(self.exporter.cancel)
+        
+        # Export animation on a background thread
+        self.export_thread = QThread(self)
+        self.export_worker = ExportWorker(self.exporter, self.export_frames, fps, file_path)
+        self.export_worker.moveToThread(self.export_thread)
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.export_dialog.setValue)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_thread.start()
+    
+    def on_export_finished(self, success, message):
+        """Shows the result of a background export"""
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_thread = None
+        self.export_worker = None
+        self.export_frames.release()
+        self.export_frames = None
+        
+        # Closing the dialog emits canceled, which must not reach the exporter
+        self.export_dialog.canceled.disconnect()
+        self.export_dialog.close()
+        self.export_dialog.deleteLater()
+        
+        # Show result, unless the export stopped because the user cancelled it
         if success:
             QMessageBox.information(self, "Export Successful", message)
-        else:
+        elif not self.exporter.cancelled:
             QMessageBox.critical(self, "Export Failed", message)
     
+    def stop_export(self):
+        """Cancels a running export and waits for its thread to finish"""
+        if self.export_thread is None:
+            return
+        
+        # The exporter stops FFmpeg and removes the partial video before its
+        # next frame, after which the thread can be stopped. Its result is
+        # no longer shown.
+        self.export_worker.finished.disconnect()
+        self.exporter.cancel()
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_thread = None
+        self.export_worker = None
+        self.export_frames.release()
+        self.export_frames = None
+        self.export_dialog.canceled.disconnect()
+        self.export_dialog.close()
+    
     def new_project(self):
         """Creates a new animation project"""
         reply = QMessageBox.question(
@@ -412,10 +515,17 @@ class MainWindow(QMainWindow):
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            # Reset the frame manager
-            self.frame_manager.frames = []
-            self.frame_manager.frame_list.clear()
-            self.frame_manager.add_frame()
+            # Reset the frame manager, repainting the frame list only once
+            frame_list = self.frame_manager.frame_list
+            frame_list.setUpdatesEnabled(False)
+            frame_list.blockSignals(True)
+            try:
+                self.frame_manager.frames.clear()
+                frame_list.clear()
+                self.frame_manager.add_frame()
+            finally:
+                frame_list.blockSignals(False)
+                frame_list.setUpdatesEnabled(True)
             
             # Clear the canvas
             self.canvas.clear()
@@ -433,54 +543,65 @@ class MainWindow(QMainWindow):
             file_path += '.atap'
         
         try:
-            # Create a temporary directory for frames
-            temp_dir = tempfile.mkdtemp()
+            # Store the frame being edited, which also updates its thumbnail
+            self.frame_manager.update_current_frame(self.canvas.get_image())
+            
+            # Thumbnails are saved too, so opening the project can skip
+            # rescaling every frame. They are taken from the frame list, so
+            # frames on disk don't have to be decoded for them.
+            frames = self.frame_manager.frames
+            frame_list = self.frame_manager.frame_list
+            indices = range(len(frames))
+            thumb_images = [frame_list.item(i).icon().pixmap(frame_list.iconSize()).toImage()
+                            for i in indices]
+            
+            # Encode all frames to PNG in memory, reusing the files of frames
+            # the store has already written to disk. PNG encoding runs in Qt
+            # without holding the GIL, so the frames are encoded in parallel,
+            # with fast compression.
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                encoded = list(executor.map(frames.png_data, indices))
+                thumbs = list(executor.map(
+                    lambda image: encode_png(image, FAST_PNG_QUALITY).data(), thumb_images))
+            for i, data in enumerate(encoded):
+                if not data:
+                    raise Exception(f"Failed to encode frame {i}")
             
-            # Save all frames as individual images
-            frame_paths = []
-            for i, frame in enumerate(self.frame_manager.frames):
-                frame_path = os.path.join(temp_dir, f"frame_{i:04d}.png")
-                # Convert to QPixmap and save
-                pixmap = QPixmap.fromImage(frame)
-                if not pixmap.save(frame_path, "PNG"):
-                    raise Exception(f"Failed to save frame {i} to {frame_path}")
-                frame_paths.append(os.path.basename(frame_path))
+            # Entries are named by a hash of their content, so identical
+            # frames (like held poses) are only stored once
+            frame_paths = [f"frame_{hashlib.blake2b(data, digest_size=8).hexdigest()}.png"
+                           for data in encoded]
+            thumb_paths = [f"thumb_{hashlib.blake2b(data, digest_size=8).hexdigest()}.png"
+                           for data in thumbs]
+            entries = dict(zip(frame_paths, encoded))
+            entries.update(zip(thumb_paths, thumbs))
             
             # Create a project info dictionary
             project_info = {
                 "fps": self.frame_manager.fps,
                 "frame_count": len(self.frame_manager.frames),
                 "frames": frame_paths,
+                "thumbs": thumb_paths,
                 "canvas_size": {
                     "width": self.canvas.width(),
                     "height": self.canvas.height()
                 }
             }
             
-            # Save project info as JSON
-            info_path = os.path.join(temp_dir, "project_info.json")
-            with open(info_path, 'w') as f:
-                json.dump(project_info, f)
-            
-            # Create zip archive
-            with zipfile.ZipFile(file_path, 'w') as zipf:
-                # Add project info file
-                zipf.write(info_path, arcname="project_info.json")
-                
-                # Add all frame images
-                for frame_name in frame_paths:
-                    frame_path = os.path.join(temp_dir, frame_name)
-                    zipf.write(frame_path, arcname=frame_name)
-            
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir)
+            # Write everything straight into the zip archive. PNG data is
+            # already compressed, so it is stored without recompressing;
+            # only the JSON text is worth deflating.
+            with zipfile.ZipFile(file_path, 'w', compression=zipfile.ZIP_STORED) as zipf:
+                zipf.writestr("project_info.json", json_dumps(project_info),
+                              compress_type=zipfile.ZIP_DEFLATED)
+                for name, data in entries.items():
+                    zipf.writestr(name, data)
             
             QMessageBox.information(self, "Save Successful", "Project saved successfully.")
             
         except Exception as e:
             QMessageBox.critical(self, "Save Error", f"Error saving project: {str(e)}")
             # Print the full traceback for debugging
-            import traceback
             traceback.print_exc()
     
     def open_project(self):
@@ -492,91 +613,131 @@ class MainWindow(QMainWindow):
             return
             
         try:
-            # Create a temporary directory for extraction
-            temp_dir = tempfile.mkdtemp()
-            
             # Verify file exists and is zip-like
             if not os.path.exists(file_path):
                 raise Exception(f"File not found: {file_path}")
                 
-            # Extract zip archive
-            import zipfile
+            # Frames are read straight from the archive, nothing is extracted
             try:
-                with zipfile.ZipFile(file_path, 'r') as zipf:
-                    zipf.extractall(temp_dir)
+                zipf = zipfile.ZipFile(file_path, 'r')
             except zipfile.BadZipFile:
                 raise Exception(f"Invalid or corrupted project file: {file_path}")
             
-            # Verify project info exists
-            info_path = os.path.join(temp_dir, "project_info.json")
-            if not os.path.exists(info_path):
-                raise Exception("Project file is missing required information")
-                
-            # Load project info
-            import json
-            with open(info_path, 'r') as f:
-                project_info = json.load(f)
-            
-            # Ask for confirmation before loading
-            reply = QMessageBox.question(
-                self, "Open Project", 
-                "This will replace your current project. Continue?",
-                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-            
-            if reply == QMessageBox.Yes:
-                # Reset the frame manager
-                self.frame_manager.frames = []
-                self.frame_manager.frame_list.clear()
+            with zipf:
+                # Verify project info exists
+                if "project_info.json" not in zipf.namelist():
+                    raise Exception("Project file is missing required information")
+                    
+                # Load project info
+                project_info = json_loads(zipf.read("project_info.json"))
                 
-                # Set FPS
-                self.frame_manager.fps = project_info.get("fps", 12)
-                self.frame_manager.fps_spinner.setValue(self.frame_manager.fps)
+                # Ask for confirmation before loading
+                reply = QMessageBox.question(
+                    self, "Open Project", 
+                    "This will replace your current project. Continue?",
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
                 
-                # Load frames
-                frame_count = 0
-                for frame_name in project_info.get("frames", []):
-                    frame_path = os.path.join(temp_dir, frame_name)
+                if reply == QMessageBox.Yes:
+                    # Reset the frame manager
+                    self.frame_manager.frames.clear()
+                    self.frame_manager.frame_list.clear()
                     
-                    # Verify frame file exists
-                    if not os.path.exists(frame_path):
-                        print(f"Warning: Frame file not found: {frame_path}")
-                        continue
+                    # Set FPS
+                    self.frame_manager.fps = project_info.get("fps", 12)
+                    self.frame_manager.fps_spinner.setValue(self.frame_manager.fps)
                     
-                    # Load the image
-                    frame = QImage(frame_path)
-                    if frame.isNull():
-                        print(f"Warning: Could not load frame: {frame_path}")
-                        continue
-                        
-                    # Add to our frames list
-                    self.frame_manager.frames.append(frame)
+                    # Projects saved with thumbnails list them next to the frames
+                    frame_names = project_info.get("frames", [])
+                    thumb_names = dict(zip(frame_names, project_info.get("thumbs", [])))
+                    entries = set(zipf.namelist())
                     
-                    # Create thumbnail and add to list
-                    thumbnail = self.frame_manager.create_thumbnail(frame)
-                    item = QListWidgetItem(f"Frame {len(self.frame_manager.frames)}")
-                    item.setIcon(QIcon(QPixmap.fromImage(thumbnail)))
-                    self.frame_manager.frame_list.addItem(item)
-                    frame_count += 1
-                
-                # Select the first frame
-                if self.frame_manager.frames:
-                    self.frame_manager.frame_list.setCurrentRow(0)
-                    self.frame_manager.current_frame_index = 0
-                    self.canvas.load_image(self.frame_manager.frames[0])
-                    self.frame_manager.frame_changed.emit(0)
+                    # Read the frame data first, since the archive can only be
+                    # read from one thread. Identical frames and thumbnails are
+                    # saved as one entry, so each entry is read only once.
+                    frame_entries = []
+                    entry_data = {}
+                    for frame_name in frame_names:
+                        # Verify frame file exists
+                        if frame_name not in entries:
+                            print(f"Warning: Frame file not found: {frame_name}")
+                            continue
+                        thumb_name = thumb_names.get(frame_name)
+                        if thumb_name not in entries:
+                            thumb_name = None
+                        for name in (frame_name, thumb_name):
+                            if name is not None and name not in entry_data:
+                                entry_data[name] = zipf.read(name)
+                        frame_entries.append((frame_name, thumb_name))
                     
-                    QMessageBox.information(self, "Open Successful", 
-                                        f"Project loaded successfully with {frame_count} frames.")
-                else:
-                    QMessageBox.warning(self, "Open Warning", "No valid frames found in the project.")
-            
-            # Clean up
-            shutil.rmtree(temp_dir)
+                    # Frames go into the frame store as their PNG data, so only
+                    # the thumbnails are decoded. A frame saved without one is
+                    # decoded to make it and then dropped again.
+                    def load_thumbnail(names):
+                        frame_name, thumb_name = names
+                        if thumb_name is not None:
+                            thumbnail = QImage.fromData(entry_data[thumb_name], "PNG")
+                            if not thumbnail.isNull() and png_readable(entry_data[frame_name]):
+                                return thumbnail
+                        frame = QImage.fromData(entry_data[frame_name], "PNG")
+                        if frame.isNull():
+                            return None
+                        return self.frame_manager.create_thumbnail(frame)
+                    
+                    # PNG decoding runs in Qt without holding the GIL, so the
+                    # thumbnails are made in parallel. Frames with the same
+                    # entries share one thumbnail.
+                    unique_entries = list(dict.fromkeys(frame_entries))
+                    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                        thumbnails = dict(zip(unique_entries, executor.map(
+                            load_thumbnail, unique_entries)))
+                    
+                    # Add the list items with updates and signals off, so the
+                    # list is laid out and repainted once instead of per item
+                    frame_list = self.frame_manager.frame_list
+                    frame_list.setUpdatesEnabled(False)
+                    frame_list.blockSignals(True)
+                    
+                    # Load frames
+                    frame_count = 0
+                    try:
+                        icons = {}
+                        for frame_name, thumb_name in frame_entries:
+                            thumbnail = thumbnails[(frame_name, thumb_name)]
+                            if thumbnail is None:
+                                print(f"Warning: Could not load frame: {frame_name}")
+                                continue
+                            
+                            # Add to our frames list
+                            self.frame_manager.frames.append_png(entry_data[frame_name])
+                            
+                            # Add the thumbnail to the list
+                            icon = icons.get((frame_name, thumb_name))
+                            if icon is None:
+                                icon = QIcon(QPixmap.fromImage(thumbnail))
+                                icons[(frame_name, thumb_name)] = icon
+                            item = QListWidgetItem(f"Frame {len(self.frame_manager.frames)}")
+                            item.setIcon(icon)
+                            frame_list.addItem(item)
+                            frame_count += 1
+                    finally:
+                        frame_list.blockSignals(False)
+                        frame_list.setUpdatesEnabled(True)
+                    
+                    # Select the first frame
+                    if self.frame_manager.frames:
+                        self.frame_manager.frame_list.setCurrentRow(0)
+                        self.frame_manager.current_frame_index = 0
+                        self.canvas.load_image(self.frame_manager.frames[0])
+                        self.frame_manager.frame_changed.emit(0)
+                        
+                        QMessageBox.information(self, "Open Successful", 
+                                            f"Project loaded successfully with {frame_count} frames.")
+                    else:
+                        QMessageBox.warning(self, "Open Warning", "No valid frames found in the project.")
             
         except Exception as e:
             QMessageBox.critical(self, "Open Error", f"Error opening project: {str(e)}")
             # Print the full traceback for debugging
-            import traceback
             traceback.print_exc()
 
     def closeEvent(self, event):
@@ -591,8 +752,10 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.Save:
             self.save_project()  # Calls the save function
+            self.stop_export()
             event.accept()  # Close the application
         elif reply == QMessageBox.Discard:
+            self.stop_export()
             event.accept()  # Close without saving
         else:
             event.ignore()  # Cancel closing the application
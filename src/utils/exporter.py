@@ -3,63 +3,220 @@ Animation exporter module for saving animations as video files
 """
 
 import os
-import shutil
+import sys
 import tempfile
 import subprocess
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+# FFmpeg pixel format matching the memory layout of QImage.Format_RGB32
+RAW_PIXEL_FORMAT = "bgra" if sys.byteorder == "little" else "argb"
+
+# libx264 presets for each export speed
+ENCODER_PRESETS = {
+    "quality": "medium",
+    "fast": "veryfast",
+    "ultra": "ultrafast",
+}
+
+# Hardware H.264 encoders in order of preference, with the options that
+# give them roughly the quality of libx264 at CRF 18
+HARDWARE_ENCODERS = {
+    "h264_nvenc": ["-cq", "18"],
+    "h264_qsv": ["-global_quality", "18"],
+    "h264_videotoolbox": ["-q:v", "65"],
+    "h264_amf": ["-rc", "cqp", "-qp_i", "18", "-qp_p", "18"],
+}
+
+class EncoderError(Exception):
+    """Raised when FFmpeg runs but fails to encode the video"""
+
 
 class AnimationExporter:
     """Handles exporting animation frames to a video file"""
     
     def __init__(self, parent=None):
         self.parent = parent
-        self.temp_dir = None
+        self.cancelled = False
+        # The H.264 encoder to use, found on the first export
+        self.video_encoder = None
     
-    def export_animation(self, frames, fps, output_path):
-        """Exports animation frames to a video file"""
-        try:
-            # Create temporary directory for frames
-            self.temp_dir = tempfile.mkdtemp()
-            
-            # Save frames as individual images
-            for i, frame in enumerate(frames):
-                frame_path = os.path.join(self.temp_dir, f"frame_{i:04d}.png")
-                frame.copy().save(frame_path)  # <-- Ensure each frame is a separate file
+    def cancel(self):
+        """Asks a running export to stop before its next frame"""
+        self.cancelled = True
+    
+    def export_animation(self, frames, fps, output_path, progress=None, speed="fast"):
+        """Exports animation frames to a video file.
+        
+        The raw pixels of each frame are streamed to FFmpeg's standard input,
+        so nothing is encoded or written to disk in between. If given,
+        progress is called with the number of frames written so far. speed
+        is one of the ENCODER_PRESETS keys.
+        """
+        if not len(frames):
+            return False, "There are no frames to export."
+        
+        if self.video_encoder is None:
+            try:
+                encoder = self.find_video_encoder()
+            except OSError as e:
+                return False, f"Export error: {str(e)}"
+            if encoder is None:
+                return False, self.ffmpeg_missing_message()
+            self.video_encoder = encoder
+        
+        while True:
+            try:
+                return self.encode(frames, fps, output_path, progress, speed)
+            except EncoderError as e:
+                if self.video_encoder == "libx264":
+                    return False, f"FFmpeg could not encode the video: {e}"
+                # A hardware encoder can pass the test frame and still fail on
+                # the real frames, so the export is retried with libx264
+                self.video_encoder = "libx264"
+    
+    def encode(self, frames, fps, output_path, progress, speed):
+        """Runs one export with the current encoder.
+        
+        Raises EncoderError with FFmpeg's error output if encoding fails.
+        """
+        if self.video_encoder == "libx264":
+            encoder_options = [
+                "-preset", ENCODER_PRESETS[speed],
+                "-crf", "18",  # Quality (lower is better)
+            ]
+        else:
+            encoder_options = HARDWARE_ENCODERS[self.video_encoder]
+        
+        width, height = frames[0].width(), frames[0].height()
+        ffmpeg_cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel", "error",  # Only errors are written to the log
+            "-y",  # Overwrite output file if it exists
+            "-f", "rawvideo",
+            "-pix_fmt", RAW_PIXEL_FORMAT,
+            "-s", f"{width}x{height}",
+            "-framerate", str(fps),
+            "-i", "-",
+            "-c:v", self.video_encoder,
+            *encoder_options,
+            "-threads", "0",  # Let FFmpeg use every core
+            "-pix_fmt", "yuv420p",
+            output_path
+        ]
+        
+        # FFmpeg's errors go to a file rather than a pipe, which could fill
+        # up and block FFmpeg while frames are still being written
+        with tempfile.TemporaryFile() as log:
+            try:
+                # Start FFmpeg (if it's in the PATH)
+                process = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stderr=log)
+            except FileNotFoundError:
+                return False, self.ffmpeg_missing_message()
+            except OSError as e:
+                return False, f"Export error: {str(e)}"
             
             try:
-                # First, try running FFmpeg normally (if it's in the PATH)
-                # Construct FFmpeg command to create video
-                input_pattern = os.path.join(self.temp_dir, "frame_%04d.png")
-                ffmpeg_cmd = [
-                    "ffmpeg",
-                    "-y",  # Overwrite output file if it exists
-                    "-framerate", str(fps),
-                    "-i", input_pattern,
-                    "-c:v", "libx264",
-                    "-pix_fmt", "yuv420p",
-                    "-crf", "18",  # Quality (lower is better)
-                    output_path
-                ]
-                
-                # Run FFmpeg
-                subprocess.run(ffmpeg_cmd, check=True)
+                for i, frame in enumerate(frames):
+                    if self.cancelled:
+                        process.kill()
+                        process.wait()
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+                        return False, "Export cancelled."
+                    
+                    # Every frame must match the size of the first one
+                    if frame.width() != width or frame.height() != height:
+                        frame = frame.scaled(width, height)
+                    frame = frame.convertToFormat(QImage.Format_RGB32)
+                    
+                    pixels = frame.constBits()
+                    pixels.setsize(frame.sizeInBytes())
+                    process.stdin.write(pixels)
+                    if progress is not None:
+                        progress(i + 1)
                 
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                # FFmpeg not found in PATH, show error with instructions
-                self.cleanup()
-                return False, ("FFmpeg is not installed or not found in the system PATH. "
-                              "Please install FFmpeg from https://ffmpeg.org/download.html "
-                              "or specify the full path to the FFmpeg executable in the code.")
+                process.stdin.close()
+            except BrokenPipeError:
+                # FFmpeg exited before reading every frame
+                pass
+            except Exception as e:
+                process.kill()
+                process.wait()
+                return False, f"Export error: {str(e)}"
             
-            # Clean up temporary files
-            self.cleanup()
-            
-            return True, "Animation exported successfully."
-            
-        except Exception as e:
-            self.cleanup()
-            return False, f"Export error: {str(e)}"
+            if process.wait() != 0:
+                log.seek(0)
+                errors = log.read().decode(errors="replace").strip().splitlines()
+                raise EncoderError("\n".join(errors[-5:]) or
+                                   f"exit status {process.returncode}")
+        
+        return True, "Animation exported successfully."
+    
+    def find_video_encoder(self):
+        """Returns the first hardware H.264 encoder that works, or libx264.
+        
+        FFmpeg builds often list hardware encoders that the machine has no
+        device for, so each listed one is tried on a single test frame.
+        Returns None if FFmpeg can't be found, and raises OSError if it
+        can't be run.
+        """
+        try:
+            listing = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                     capture_output=True, text=True).stdout
+        except FileNotFoundError:
+            return None
+        available = {line.split()[1] for line in listing.splitlines()
+                     if len(line.split()) > 1}
+        
+        for encoder in HARDWARE_ENCODERS:
+            if encoder not in available:
+                continue
+            test_cmd = [
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=size=256x256:duration=0.1",
+                "-frames:v", "1",
+                "-c:v", encoder, *HARDWARE_ENCODERS[encoder],
+                "-pix_fmt", "yuv420p",
+                "-f", "null", "-"
+            ]
+            try:
+                result = subprocess.run(test_cmd, capture_output=True, timeout=10)
+            except subprocess.TimeoutExpired:
+                continue
+            if result.returncode == 0:
+                return encoder
+        return "libx264"
     
-    def cleanup(self):
-        """Cleans up temporary files"""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
\ No newline at end of file
+    def ffmpeg_missing_message(self):
+        """Returns the error shown when FFmpeg can't be run"""
+        return ("FFmpeg is not installed or not found in the system PATH. "
+                "Please install FFmpeg from https://ffmpeg.org/download.html "
+                "or specify the full path to the FFmpeg executable in the code.")
+
+
+class ExportWorker(QObject):
+    """Runs an animation export on a background thread"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(bool, str)
+    
+    def __init__(self, exporter, frames, fps, output_path):
+        super().__init__()
+        self.exporter = exporter
+        self.exporter.cancelled = False
+        # Frames are read one at a time while exporting, so a frame store
+        # doesn't have to decode every frame up front
+        self.frames = frames
+        self.fps = fps
+        self.output_path = output_path
+    
+    def run(self):
+        """Exports the frames, reporting progress and the final result"""
+        try:
+            success, message = self.exporter.export_animation(
+                self.frames, self.fps, self.output_path, self.progress.emit)
+        except Exception as e:
+            # An exception can't leave the worker thread, so it is reported
+            success, message = False, f"Export error: {str(e)}"
+        self.finished.emit(success, message)